@@ -0,0 +1,365 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import gen_lrc
+import lrc_app
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_AUDIO = {"m4a": "b.m4a", "mp3": "像素炼金术2.mp3"}
+CJK_POOL = "今天下雨你我他的是在有不了人这中大为上个国以要时来用们生到作地于出就分对成会可主发年动同工也能"
+LATIN_POOL = ["hello", "world", "night", "light", "dream", "river", "flux", "prompt", "model", "node",
+              "baby", "tonight", "again", "forever", "yeah", "oh", "love", "city", "rain", "fire"]
+MIXES = ("cjk", "latin", "mixed")
+IMPORT_TARGETS = ("lrc_app", "gen_lrc", "watch_lrc", "web_app")
+# Modules that a bare import of an entry point must not load; commands that
+# need them import them on first use.
+HEAVY_MODULES = ("mutagen", "imghdr", "torch", "whisper", "whisperx", "rapidfuzz")
+# Median import time allowed per entry point whenever the imports group runs.
+IMPORT_BUDGET_MS = 100
+# Framework imports an entry point cannot avoid are loaded before the timer
+# starts, so the budget measures this repo's own import cost.
+IMPORT_PRELOAD = {"web_app": ("flask",)}
+_IMPORT_PROBE = ("import json, sys, time\n"
+                 "{preload}"
+                 "t0 = time.perf_counter()\n"
+                 "import {mod}\n"
+                 "dt = time.perf_counter() - t0\n"
+                 "print(json.dumps({{'s': dt, 'heavy': sorted(m for m in {heavy!r} if m in sys.modules)}}))")
+
+def _parse_sizes(s: str) -> list:
+    return [int(x) for x in s.split(",") if x.strip()]
+
+def synth_tokens(n: int, mix: str, rng: random.Random) -> list:
+    """
+    Build a list of n lyric tokens.
+
+    Args:
+        n: The number of tokens.
+        mix: "cjk", "latin" or "mixed".
+        rng: The random generator.
+
+    Returns:
+        A list of tokens as tokenize() would produce them.
+    """
+    out = []
+    for _ in range(n):
+        cjk = mix == "cjk" or (mix == "mixed" and rng.random() < 0.7)
+        out.append(rng.choice(CJK_POOL) if cjk else rng.choice(LATIN_POOL))
+    return out
+
+def synth_lyrics(tokens: list, rng: random.Random) -> list:
+    """
+    Group tokens into lyric lines of 4 to 12 tokens.
+
+    Args:
+        tokens: The tokens from synth_tokens().
+        rng: The random generator.
+
+    Returns:
+        A list of lyric lines.
+    """
+    lines = []
+    i = 0
+    while i < len(tokens):
+        k = rng.randint(4, 12)
+        buf = ""
+        for t in tokens[i:i + k]:
+            if buf and not (gen_lrc._is_cjk(t[0]) and gen_lrc._is_cjk(buf[-1])):
+                buf += " "
+            buf += t
+        lines.append(buf)
+        i += k
+    return lines
+
+def synth_transcript(tokens: list, rng: random.Random) -> list:
+    """
+    Simulate ASR output for the given lyric tokens, with dropped, substituted
+    and inserted words and increasing timestamps.
+
+    Args:
+        tokens: The reference tokens.
+        rng: The random generator.
+
+    Returns:
+        A list of {"text", "start", "end"} dicts like gen_lrc._get_words().
+    """
+    words = []
+    t = 0.5
+    for tok in tokens:
+        r = rng.random()
+        if r < 0.05:
+            continue
+        if r < 0.10:
+            tok = rng.choice(CJK_POOL) if gen_lrc._is_cjk(tok[0]) else tok[:-1] + "x"
+        elif r < 0.13:
+            words.append({"text": rng.choice(LATIN_POOL), "start": t, "end": t + 0.2})
+            t += 0.25
+        dur = rng.uniform(0.15, 0.45)
+        words.append({"text": tok, "start": t, "end": t + dur})
+        t += dur + rng.uniform(0.0, 0.1)
+    return words
+
+def synth_lrc(n: int, rng: random.Random) -> tuple[dict, list]:
+    """
+    Build an LRC corpus of n timed lines.
+
+    Args:
+        n: The number of lines.
+        rng: The random generator.
+
+    Returns:
+        A (headers, entries) tuple in the format used by lrc_app.
+    """
+    headers = {"ti": "bench", "ar": "bench", "al": "bench", "by": "bench_lrc", "offset": "0"}
+    entries = []
+    t = 0
+    for _ in range(n):
+        t += rng.randint(800, 6000)
+        entries.append({"t": t, "text": " ".join(synth_lyrics(synth_tokens(8, "mixed", rng), rng))})
+    return headers, entries
+
+def measure(fn, budget: float, max_repeat: int) -> dict:
+    """
+    Run fn repeatedly and record its timings.
+
+    One untimed warm-up call comes first so regex compilation and lazy imports
+    (such as gen_lrc's _ratio backend) do not land in the first sample. Then it
+    runs at least once and stops after max_repeat runs or once budget seconds
+    have been spent, so large sizes do not dominate the whole suite.
+
+    Args:
+        fn: A callable taking no arguments.
+        budget: The time budget in seconds.
+        max_repeat: The maximum number of runs.
+
+    Returns:
+        A dict with min/median/max seconds and the number of runs.
+    """
+    fn()
+    times = []
+    spent = 0.0
+    while len(times) < max_repeat and (not times or spent < budget):
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        times.append(dt)
+        spent += dt
+    return {"min_s": min(times), "median_s": statistics.median(times), "max_s": max(times), "runs": len(times)}
+
+class _StubASR:
+    """
+    Replace gen_lrc._get_words with a function returning a fixed transcript.
+    """
+
+    def __init__(self, words: list):
+        self.words = words
+
+    def __enter__(self):
+        self.orig = gen_lrc._get_words
+        gen_lrc._get_words = lambda audio_path, *args: self.words
+        return self
+
+    def __exit__(self, *exc):
+        gen_lrc._get_words = self.orig
+
+def _bench_text(results: dict, args: argparse.Namespace, tmp: str) -> None:
+    for mix in args.mixes:
+        for n in args.sizes:
+            rng = random.Random(f"{args.seed}/{mix}/{n}")
+            lines = synth_lyrics(synth_tokens(n, mix, rng), rng)
+            results[f"tokenize/{mix}/{n}"] = measure(lambda: [gen_lrc.tokenize(ln) for ln in lines], args.budget, args.repeat)
+        for n in args.align_sizes:
+            rng = random.Random(f"{args.seed}/{mix}/{n}")
+            ref = synth_tokens(n, mix, rng)
+            lines = synth_lyrics(ref, rng)
+            words = synth_transcript(ref, rng)
+            hyp = [w["text"] for w in words]
+            results[f"align_tokens/{mix}/{n}"] = measure(lambda: gen_lrc.align_tokens(ref, hyp), args.budget, args.repeat)
+            lyrics_path = os.path.join(tmp, f"lyrics_{mix}_{n}.txt")
+            out_path = os.path.join(tmp, f"out_{mix}_{n}.lrc")
+            with open(lyrics_path, "w", encoding="utf-8") as f:
+                f.write("\n".join(lines))
+            with _StubASR(words):
+                results[f"generate_lrc/{mix}/{n}"] = measure(lambda: gen_lrc.generate_lrc("stub.mp3", lyrics_path, out_path), args.budget, args.repeat)
+
+def _bench_lrc(results: dict, args: argparse.Namespace, tmp: str) -> None:
+    for n in args.sizes:
+        rng = random.Random(f"{args.seed}/lrc/{n}")
+        secs = [rng.uniform(0, 600) for _ in range(n)]
+        ms = [int(s * 1000) for s in secs]
+        for d in (2, 3):
+            results[f"gen_lrc._fmt_ts/{d}/{n}"] = measure(lambda: [gen_lrc._fmt_ts(s, d) for s in secs], args.budget, args.repeat)
+            results[f"lrc_app._fmt_ts/{d}/{n}"] = measure(lambda: [lrc_app._fmt_ts(x, d) for x in ms], args.budget, args.repeat)
+        headers, entries = synth_lrc(n, rng)
+        path = os.path.join(tmp, f"corpus_{n}.lrc")
+        results[f"write_lrc/{n}"] = measure(lambda: lrc_app.write_lrc(path, headers, entries), args.budget, args.repeat)
+        results[f"read_lrc/{n}"] = measure(lambda: lrc_app.read_lrc(path), args.budget, args.repeat)
+
+def _bench_tags(results: dict, args: argparse.Namespace, tmp: str) -> None:
+    for kind, name in SAMPLE_AUDIO.items():
+        src = os.path.join(HERE, name)
+        if not os.path.exists(src):
+            continue
+        dst = os.path.join(tmp, "sample." + kind)
+        shutil.copyfile(src, dst)
+        results[f"set_audio_tags/{kind}"] = measure(lambda: lrc_app.set_audio_tags(dst, "bench", "bench", "bench"), args.budget, args.repeat)
+
+def _bench_imports(results: dict, args: argparse.Namespace, tmp: str) -> None:
+    # Each run is a fresh interpreter so nothing is already in sys.modules.
+    for mod in IMPORT_TARGETS:
+        preload = "".join(f"import {m}\n" for m in IMPORT_PRELOAD.get(mod, ()))
+        code = _IMPORT_PROBE.format(mod=mod, heavy=HEAVY_MODULES, preload=preload)
+        times = []
+        heavy = []
+        for _ in range(args.repeat):
+            p = subprocess.run([sys.executable, "-W", "ignore", "-c", code], cwd=HERE, capture_output=True, text=True)
+            if p.returncode != 0:
+                err = p.stderr.strip().splitlines()[-1] if p.stderr.strip() else f"exit {p.returncode}"
+                results[f"import/{mod}"] = {"error": err, "runs": 0}
+                times = []
+                break
+            r = json.loads(p.stdout.strip().splitlines()[-1])
+            times.append(r["s"])
+            heavy = r["heavy"]
+        if times:
+            results[f"import/{mod}"] = {"min_s": min(times), "median_s": statistics.median(times), "max_s": max(times),
+                                        "runs": len(times), "heavy": heavy}
+
+def check_imports(results: dict, budget_ms: float) -> list:
+    """
+    Find entry points whose import exceeds the budget or loads heavy modules.
+
+    Args:
+        results: The "results" dict of a run.
+        budget_ms: The maximum median import time in milliseconds.
+
+    Returns:
+        A list of human readable failure messages, empty if all passed.
+    """
+    failures = []
+    checked = [k for k in results if k.startswith("import/")]
+    if not checked:
+        failures.append("no import results; run with --groups imports")
+    for k in checked:
+        r = results[k]
+        if "error" in r:
+            failures.append(f"{k} failed to import: {r['error']}")
+            continue
+        if r["median_s"] * 1000 > budget_ms:
+            failures.append(f"{k} took {r['median_s'] * 1000:.1f} ms (budget {budget_ms:.0f} ms)")
+        if r["heavy"]:
+            failures.append(f"{k} loaded {', '.join(r['heavy'])} at import time")
+    return failures
+
+GROUPS = {"text": _bench_text, "lrc": _bench_lrc, "tags": _bench_tags, "imports": _bench_imports}
+
+def run(args: argparse.Namespace) -> dict:
+    """
+    Run the selected benchmark groups.
+
+    Args:
+        args: The parsed command line arguments.
+
+    Returns:
+        A dict with run metadata and per-benchmark timings.
+    """
+    try:
+        import rapidfuzz
+        ratio_impl = "rapidfuzz " + rapidfuzz.__version__
+    except Exception:
+        ratio_impl = "difflib"
+    meta = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "ratio": ratio_impl,
+        "seed": args.seed,
+        "sizes": args.sizes,
+        "align_sizes": args.align_sizes,
+    }
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for g in args.groups:
+            GROUPS[g](results, args, tmp)
+    return {"meta": meta, "results": results}
+
+def compare(base: dict, new: dict) -> None:
+    """
+    Print the median time of each benchmark next to a baseline run.
+
+    Args:
+        base: A previous run loaded from JSON.
+        new: The current run.
+    """
+    print(f"{'benchmark':40} {'base ms':>10} {'new ms':>10} {'ratio':>7}")
+    for k, r in new["results"].items():
+        b = base.get("results", {}).get(k)
+        if "error" in r:
+            print(f"{k:40} failed: {r['error']}")
+            continue
+        nm = r["median_s"] * 1000
+        if b is None or "error" in b:
+            print(f"{k:40} {'-':>10} {nm:10.3f} {'-':>7}")
+            continue
+        bm = b["median_s"] * 1000
+        print(f"{k:40} {bm:10.3f} {nm:10.3f} {nm / bm if bm else 0:7.2f}")
+
+def main() -> None:
+    """
+    Main function to parse command line arguments and run the benchmarks.
+    """
+    p = argparse.ArgumentParser()
+    p.add_argument("--groups", default=",".join(GROUPS), help="comma separated: " + ",".join(GROUPS))
+    p.add_argument("--mixes", default=",".join(MIXES))
+    p.add_argument("--sizes", default="100,1000,10000", help="token/line counts for tokenize, _fmt_ts and LRC I/O")
+    p.add_argument("--align-sizes", default="100,300,1000",
+                   help="token counts for align_tokens and generate_lrc; time and memory grow with n*m, "
+                        "so sizes above a few thousand need several GB (10000 does not fit)")
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--budget", type=float, default=2.0, help="seconds per benchmark before it stops repeating")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", help="write results as JSON")
+    p.add_argument("--compare", help="baseline JSON to compare against")
+    p.add_argument("--import-budget-ms", type=float,
+                   help=f"fail if an entry point fails to import, imports slower than this, or loads heavy modules "
+                        f"(default {IMPORT_BUDGET_MS} when the imports group runs)")
+    args = p.parse_args()
+    args.groups = [g for g in args.groups.split(",") if g]
+    args.mixes = [m for m in args.mixes.split(",") if m]
+    args.sizes = _parse_sizes(args.sizes)
+    args.align_sizes = _parse_sizes(args.align_sizes)
+    res = run(args)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(res, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(json.load(f), res)
+    else:
+        for k, r in res["results"].items():
+            if "error" in r:
+                print(f"{k:40} failed: {r['error']}")
+                continue
+            print(f"{k:40} {r['median_s'] * 1000:10.3f} ms  ({r['runs']} runs)")
+    budget_ms = args.import_budget_ms
+    if budget_ms is None and "imports" in args.groups:
+        budget_ms = IMPORT_BUDGET_MS
+    if budget_ms is not None:
+        failures = check_imports(res["results"], budget_ms)
+        for msg in failures:
+            print("IMPORT_BUDGET_FAIL " + msg, file=sys.stderr)
+        if failures:
+            sys.exit(1)
+        print("IMPORT_BUDGET_OK")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+import argparse
+import difflib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import gen_lrc
+import lrc_metrics
+from lrc_metrics import peak_rss_mb
+from lrc_app import read_lrc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# (audio, lyrics, reference lrc); lyrics may be an .lrc, gen_lrc strips its tags.
+DEFAULT_CASES = [("b.m4a", "a.txt", "a_2.lrc")]
+DEFAULT_CONFIGS = ["model=medium", "model=small", "model=base"]
+CONFIG_KEYS = ("model", "backend", "compute_type")
+PERCENTILES = (50, 90, 95, 99)
+
+def parse_config(spec: str) -> dict:
+    """
+    Parse a configuration like "model=small,backend=whisper,compute_type=int8".
+
+    Args:
+        spec: The configuration string.
+
+    Returns:
+        A dict of generate_lrc options.
+    """
+    cfg = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        k, _, v = part.partition("=")
+        k = k.strip()
+        if k not in CONFIG_KEYS:
+            raise ValueError(f"unknown config key {k!r} in {spec!r}, expected one of {', '.join(CONFIG_KEYS)}")
+        cfg[k] = v.strip()
+    if cfg.get("compute_type") and cfg.get("backend") != "whisperx":
+        # openai-whisper ignores compute_type, and the default backend falls
+        # back to it silently, so the label would not match what ran.
+        raise ValueError(f"compute_type needs backend=whisperx in {spec!r}")
+    return cfg
+
+def _percentile(xs: list, p: float) -> float | None:
+    if not xs:
+        return None
+    xs = sorted(xs)
+    k = (len(xs) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(xs) - 1)
+    return xs[lo] + (xs[hi] - xs[lo]) * (k - lo)
+
+def _line_tokens(entries: list) -> tuple[list, list]:
+    tokens = []
+    owner = []
+    for i, e in enumerate(entries):
+        ts = gen_lrc.tokenize(e["text"])
+        tokens.extend(ts)
+        owner.extend([i] * len(ts))
+    return tokens, owner
+
+def score(ref: list, hyp: list) -> dict:
+    """
+    Compare generated LRC entries against reference entries.
+
+    Lines are matched through their tokens rather than by index, because
+    generate_lrc splits lyric lines on spaces and may produce more lines than the
+    reference. A reference line counts as matched when a generated line starts
+    on one of its tokens; its onset error is measured against the earliest such
+    line.
+
+    Args:
+        ref: Reference entries from read_lrc().
+        hyp: Generated entries from read_lrc().
+
+    Returns:
+        A dict with matched/unmatched counts and onset error percentiles in ms.
+    """
+    ref_tok, ref_owner = _line_tokens(ref)
+    hyp_tok, hyp_owner = _line_tokens(hyp)
+    hyp_start = {}
+    for j, o in enumerate(hyp_owner):
+        if j == 0 or hyp_owner[j - 1] != o:
+            hyp_start[j] = o
+    onset = {}
+    sm = difflib.SequenceMatcher(None, ref_tok, hyp_tok, autojunk=False)
+    for a, b, size in sm.get_matching_blocks():
+        for k in range(size):
+            hl = hyp_start.get(b + k)
+            rl = ref_owner[a + k]
+            if hl is not None and rl not in onset:
+                onset[rl] = hyp[hl]["t"]
+    scored = [i for i, e in enumerate(ref) if gen_lrc.tokenize(e["text"])]
+    errors = [abs(onset[i] - ref[i]["t"]) for i in scored if i in onset]
+    out = {
+        "ref_lines": len(scored),
+        "hyp_lines": len(hyp),
+        "matched": len(errors),
+        "unmatched_rate": (1 - len(errors) / len(scored)) if scored else 0.0,
+        "mean_ms": sum(errors) / len(errors) if errors else None,
+        "max_ms": max(errors) if errors else None,
+    }
+    for p in PERCENTILES:
+        out[f"p{p}_ms"] = _percentile(errors, p)
+    return out
+
+def run_config(cfg: dict, cases: list) -> dict:
+    """
+    Run generate_lrc for every case with one configuration, in this process.
+
+    Args:
+        cfg: Options from parse_config().
+        cases: A list of (audio, lyrics, reference) paths.
+
+    Returns:
+        A dict with per-case scores and timings, total wall time and peak RSS.
+    """
+    out = {"cases": {}, "errors": {}}
+    t_all = time.perf_counter()
+    with tempfile.TemporaryDirectory() as tmp:
+        for audio, lyrics, ref_path in cases:
+            name = os.path.basename(audio)
+            out_path = os.path.join(tmp, os.path.splitext(name)[0] + ".lrc")
+            t0 = time.perf_counter()
+            try:
+                with lrc_metrics.collect("eval_lrc") as run:
+                    gen_lrc.generate_lrc(audio, lyrics, out_path, 3, cfg.get("model", "medium"), cfg.get("backend"), cfg.get("compute_type"))
+            except Exception as e:
+                out["errors"][name] = f"{type(e).__name__}: {e}"
+                continue
+            wall = time.perf_counter() - t0
+            fell_back = bool(run.counts.get("whisperx_fallback"))
+            _, ref = read_lrc(ref_path)
+            _, hyp = read_lrc(out_path)
+            res = score(ref, hyp)
+            res["wall_s"] = wall
+            res["backend"] = "whisper" if fell_back or cfg.get("backend") == "whisper" else "whisperx"
+            res["fell_back"] = fell_back
+            res["stages"] = run.stages
+            out["cases"][name] = res
+    out["wall_s"] = time.perf_counter() - t_all
+    out["peak_rss_mb"] = peak_rss_mb()
+    out["summary"] = _summarize(list(out["cases"].values()))
+    return out
+
+def _summarize(case_results: list) -> dict:
+    # Percentiles are the worst value across cases so one bad song is not
+    # averaged away.
+    ref_lines = sum(c["ref_lines"] for c in case_results)
+    matched = sum(c["matched"] for c in case_results)
+    worst = {}
+    for p in PERCENTILES:
+        vals = [c[f"p{p}_ms"] for c in case_results if c[f"p{p}_ms"] is not None]
+        worst[f"p{p}_ms"] = max(vals) if vals else None
+    return {"ref_lines": ref_lines, "matched": matched,
+            "unmatched_rate": (1 - matched / ref_lines) if ref_lines else None, **worst}
+
+def _run_isolated(spec: str, cases: list) -> dict:
+    # A fresh interpreter per configuration keeps peak RSS and model load time
+    # from leaking between configurations.
+    p = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", spec, "--cases-json", json.dumps(cases)],
+                       capture_output=True, text=True)
+    if p.returncode != 0:
+        return {"cases": {}, "errors": {"worker": p.stderr.strip().splitlines()[-1] if p.stderr.strip() else f"exit {p.returncode}"}}
+    return json.loads(p.stdout.strip().splitlines()[-1])
+
+def _fell_back(res: dict) -> list:
+    return [name for name, c in res.get("cases", {}).items() if c.get("fell_back")]
+
+def _complete(res: dict) -> bool:
+    # A config that crashed on any case is not comparable: its summary and
+    # wall time only cover the songs that happened to succeed. Neither is one
+    # where whisperx fell back to openai-whisper, since its numbers belong to
+    # a different pipeline than its label says.
+    return "summary" in res and not res["errors"] and not _fell_back(res) and bool(res["summary"]["ref_lines"])
+
+def _passes(res: dict, max_p95: float | None, max_unmatched: float | None) -> bool:
+    if not _complete(res):
+        return False
+    summary = res["summary"]
+    if max_p95 is not None and (summary["p95_ms"] is None or summary["p95_ms"] > max_p95):
+        return False
+    if max_unmatched is not None and (summary["unmatched_rate"] is None or summary["unmatched_rate"] > max_unmatched):
+        return False
+    return True
+
+def _cell(v: float | None) -> str:
+    return f"{v:8.0f}" if v is not None else f"{'-':>8}"
+
+def _pct(v: float | None) -> str:
+    return f"{v:8.1%}" if v is not None else f"{'-':>8}"
+
+def main() -> None:
+    """
+    Main function to parse command line arguments and run the evaluation.
+    """
+    p = argparse.ArgumentParser()
+    p.add_argument("--config", action="append", help="e.g. model=small,backend=whisper,compute_type=int8 (repeatable)")
+    p.add_argument("--case", action="append", nargs=3, metavar=("AUDIO", "LYRICS", "REF_LRC"))
+    p.add_argument("--max-p95-ms", type=float, help="accuracy limit on the p95 onset error")
+    p.add_argument("--max-unmatched", type=float, help="accuracy limit on the unmatched-line rate (0-1)")
+    p.add_argument("--in-process", action="store_true", help="run all configurations in this process (peak RSS becomes cumulative)")
+    p.add_argument("--out", help="write results as JSON")
+    p.add_argument("--worker", help=argparse.SUPPRESS)
+    p.add_argument("--cases-json", help=argparse.SUPPRESS)
+    args = p.parse_args()
+    if args.worker:
+        print(json.dumps(run_config(parse_config(args.worker), json.loads(args.cases_json)), ensure_ascii=False))
+        return
+    if args.case:
+        cases = [tuple(c) for c in args.case]
+    else:
+        cases = [tuple(os.path.join(HERE, x) for x in c) for c in DEFAULT_CASES]
+    for c in [c for c in cases if not all(os.path.exists(x) for x in c)]:
+        print(f"Skipping case with missing files: {' '.join(c)}", file=sys.stderr)
+    cases = [c for c in cases if all(os.path.exists(x) for x in c)]
+    if not cases:
+        print("No evaluation cases found", file=sys.stderr)
+        sys.exit(1)
+    specs = args.config or DEFAULT_CONFIGS
+    for spec in specs:
+        try:
+            parse_config(spec)
+        except ValueError as e:
+            p.error(str(e))
+    results = {}
+    for spec in specs:
+        res = run_config(parse_config(spec), cases) if args.in_process else _run_isolated(spec, cases)
+        res["complete"] = _complete(res)
+        res["passes"] = _passes(res, args.max_p95_ms, args.max_unmatched)
+        results[spec] = res
+    print(f"{'config':40} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'unmatch':>8} {'wall s':>8} {'rss MB':>8}  ok")
+    for spec, r in results.items():
+        s = r.get("summary")
+        if not s:
+            print(f"{spec:40} failed: {r['errors']}")
+            continue
+        print(f"{spec:40} {_cell(s['p50_ms'])} {_cell(s['p95_ms'])} {_cell(s['p99_ms'])} {_pct(s['unmatched_rate'])} {r['wall_s']:8.1f} {_cell(r['peak_rss_mb'])}  {'yes' if r['passes'] else 'no'}")
+        for name, e in r["errors"].items():
+            print(f"  {name}: {e}")
+        fb = _fell_back(r)
+        if fb:
+            print(f"  not comparable: whisperx fell back to openai-whisper on {', '.join(fb)}; set backend= explicitly")
+    ok = [spec for spec, r in results.items() if r["passes"]]
+    if args.max_p95_ms is not None or args.max_unmatched is not None:
+        best = min(ok, key=lambda s: results[s]["wall_s"]) if ok else None
+        print(f"cheapest passing config: {best}" if best else "no config within the accuracy limits")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump({"cases": cases, "results": results}, fh, ensure_ascii=False, indent=2)
+    if not any(r["complete"] for r in results.values()):
+        print("no config completed every case", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ import re
 import sys
 import unicodedata
 
+import lrc_metrics
+
 def _is_cjk(ch):
     o = ord(ch)
     return 0x4E00 <= o <= 0x9FFF or 0x3400 <= o <= 0x4DBF or 0x20000 <= o <= 0x2A6DF or 0x2A700 <= o <= 0x2B73F or 0x2B740 <= o <= 0x2B81F or 0x2B820 <= o <= 0x2CEAF
@@ -66,13 +68,23 @@ def _fmt_ts(t, ms_digits=3):
             s = 0
     return f"[{m:02d}:{s:02d}]"
 
+_ratio_impl = None
+
+def _difflib_ratio(a, b):
+    import difflib
+    return int(difflib.SequenceMatcher(None, a, b).ratio() * 100)
+
 def _ratio(a, b):
-    try:
-        from rapidfuzz import fuzz
-        return fuzz.ratio(a, b)
-    except Exception:
-        import difflib
-        return int(difflib.SequenceMatcher(None, a, b).ratio() * 100)
+    # Resolve rapidfuzz once; retrying a failed import on every call is costly
+    # inside align_tokens.
+    global _ratio_impl
+    if _ratio_impl is None:
+        try:
+            from rapidfuzz import fuzz
+            _ratio_impl = fuzz.ratio
+        except Exception:
+            _ratio_impl = _difflib_ratio
+    return _ratio_impl(a, b)
 
 def align_tokens(ref, hyp):
     n, m = len(ref), len(hyp)
@@ -84,9 +96,14 @@ def align_tokens(ref, hyp):
     for j in range(1, m + 1):
         dp[0][j] = j
         bt[0][j] = (0, j - 1)
+    ratio_calls = 0
     for i in range(1, n + 1):
         for j in range(1, m + 1):
-            sub = 0 if ref[i - 1] == hyp[j - 1] else (0 if _ratio(ref[i - 1], hyp[j - 1]) >= 90 else 1)
+            if ref[i - 1] == hyp[j - 1]:
+                sub = 0
+            else:
+                ratio_calls += 1
+                sub = 0 if _ratio(ref[i - 1], hyp[j - 1]) >= 90 else 1
             a = dp[i - 1][j] + 1
             b = dp[i][j - 1] + 1
             c = dp[i - 1][j - 1] + sub
@@ -107,21 +124,36 @@ def align_tokens(ref, hyp):
             pairs.append((i - 1, j - 1))
         i, j = pi, pj
     pairs.reverse()
+    lrc_metrics.count("ratio_calls", ratio_calls)
     mapping = {}
     for ri, hj in pairs:
         if ri not in mapping:
             mapping[ri] = hj
     return mapping
 
-def _get_words_whisperx(audio_path, device):
+_MODELS = {}
+
+def _cached_model(key, load):
+    # Models stay loaded for the life of the process so long-running callers
+    # (watch_lrc) only pay the load cost once.
+    if key not in _MODELS:
+        with lrc_metrics.stage("model_load"):
+            _MODELS[key] = load()
+    return _MODELS[key]
+
+def _get_words_whisperx(audio_path, model_name="medium", compute_type=None):
     import whisperx
-    dev = device
-    model = whisperx.load_model("medium", device=dev)
-    audio = whisperx.load_audio(audio_path)
-    result = model.transcribe(audio)
+    dev = _get_device()
+    kw = {"compute_type": compute_type} if compute_type else {}
+    model = _cached_model(("whisperx", model_name, dev, compute_type), lambda: whisperx.load_model(model_name, device=dev, **kw))
+    with lrc_metrics.stage("audio_decode"):
+        audio = whisperx.load_audio(audio_path)
+    with lrc_metrics.stage("transcribe"):
+        result = model.transcribe(audio)
     lang = result.get("language", "en")
-    amodel, meta = whisperx.load_align_model(language_code=lang, device=dev)
-    aligned = whisperx.align(result["segments"], amodel, meta, audio, device=dev)
+    amodel, meta = _cached_model(("whisperx-align", lang, dev), lambda: whisperx.load_align_model(language_code=lang, device=dev))
+    with lrc_metrics.stage("asr_align"):
+        aligned = whisperx.align(result["segments"], amodel, meta, audio, device=dev)
     words = []
     for seg in aligned.get("segments", []):
         for w in seg.get("words", []):
@@ -129,10 +161,14 @@ def _get_words_whisperx(audio_path, device):
                 words.append({"text": _normalize(w.get("word", "")), "start": float(w["start"]), "end": float(w["end"])})
     return words
 
-def _get_words_whisper(audio_path, device):
+def _get_words_whisper(audio_path, model_name="medium"):
     import whisper
-    model = whisper.load_model("medium", device=device)
-    result = model.transcribe(audio_path, word_timestamps=True, fp16=False, verbose=False)
+    device = _get_device()
+    model = _cached_model(("whisper", model_name, device), lambda: whisper.load_model(model_name, device=device))
+    with lrc_metrics.stage("audio_decode"):
+        audio = whisper.load_audio(audio_path)
+    with lrc_metrics.stage("transcribe"):
+        result = model.transcribe(audio, word_timestamps=True, fp16=False, verbose=False)
     words = []
     for seg in result.get("segments", []):
         for w in seg.get("words", []):
@@ -141,23 +177,44 @@ def _get_words_whisper(audio_path, device):
                 words.append({"text": _normalize(txt), "start": float(w["start"]), "end": float(w["end"])})
     return words
 
+_device = None
+
 def _get_device():
-    try:
-        import torch
-        return "cuda" if torch.cuda.is_available() else "cpu"
-    except Exception:
-        return "cpu"
+    # Called after the ASR backend is imported (it loads torch anyway), and
+    # LRC_DEVICE skips the CUDA probe entirely.
+    global _device
+    if _device is None:
+        with lrc_metrics.stage("device"):
+            _device = os.environ.get("LRC_DEVICE")
+            if not _device:
+                try:
+                    import torch
+                    _device = "cuda" if torch.cuda.is_available() else "cpu"
+                except Exception:
+                    _device = "cpu"
+    return _device
 
-def _get_words(audio_path):
-    device = _get_device()
+def _get_words(audio_path, model_name="medium", backend=None, compute_type=None):
+    # backend=None tries whisperx first and falls back to openai-whisper.
+    if backend == "whisper":
+        return _get_words_whisper(audio_path, model_name)
     try:
-        return _get_words_whisperx(audio_path, device)
+        with lrc_metrics.failed_stage("whisperx_failed"):
+            return _get_words_whisperx(audio_path, model_name, compute_type)
     except Exception:
-        return _get_words_whisper(audio_path, device)
+        if backend == "whisperx":
+            raise
+        lrc_metrics.count("whisperx_fallback")
+        return _get_words_whisper(audio_path, model_name)
+
+def generate_lrc(audio_path, lyrics_path, out_path, ms_digits=3, model_name="medium", backend=None, compute_type=None):
+    with lrc_metrics.run("generate_lrc"):
+        return _generate_lrc(audio_path, lyrics_path, out_path, ms_digits, model_name, backend, compute_type)
 
-def generate_lrc(audio_path, lyrics_path, out_path, ms_digits=3):
-    words = _get_words(audio_path)
+def _generate_lrc(audio_path, lyrics_path, out_path, ms_digits, model_name, backend, compute_type):
+    words = _get_words(audio_path, model_name, backend, compute_type)
     hyp_tokens = [w["text"] for w in words]
+    lrc_metrics.count("words", len(words))
     with open(lyrics_path, "r", encoding="utf-8") as f:
         lines = [ln.rstrip("\n") for ln in f.readlines()]
     clean_lines = []
@@ -169,9 +226,13 @@ def generate_lrc(audio_path, lyrics_path, out_path, ms_digits=3):
             for sentence in sentences:
                 if sentence:
                     clean_lines.append(sentence)
-    line_tokens = [tokenize(ln) for ln in clean_lines]
+    with lrc_metrics.stage("tokenize"):
+        line_tokens = [tokenize(ln) for ln in clean_lines]
     ref_tokens = [t for ts in line_tokens for t in ts]
-    mapping = align_tokens(ref_tokens, hyp_tokens)
+    lrc_metrics.count("ref_tokens", len(ref_tokens))
+    lrc_metrics.count("hyp_tokens", len(hyp_tokens))
+    with lrc_metrics.stage("align"):
+        mapping = align_tokens(ref_tokens, hyp_tokens)
     idx = 0
     line_ranges = []
     for ts in line_tokens:
@@ -183,6 +244,7 @@ def generate_lrc(audio_path, lyrics_path, out_path, ms_digits=3):
     for i, (a, b) in enumerate(line_ranges):
         hyp_idxs = [mapping[k] for k in range(a, b + 1) if k in mapping]
         if hyp_idxs:
+            lrc_metrics.count("lines_matched")
             s = words[min(hyp_idxs)]["start"]
             lrc.append(f"{_fmt_ts(s, ms_digits)}{clean_lines[i]}")
         else:
@@ -194,12 +256,15 @@ def generate_lrc(audio_path, lyrics_path, out_path, ms_digits=3):
                 ps = words[min(prev_idxs)]["end"] if prev_idxs else (words[0]["start"] if words else 0.0)
                 ns = words[min(next_idxs)]["start"] if next_idxs else (words[-1]["end"] if words else ps)
                 s = ps + (ns - ps) * 0.5
+                lrc_metrics.count("lines_interpolated")
                 lrc.append(f"{_fmt_ts(s, ms_digits)}{clean_lines[i]}")
             else:
                 t = words[0]["start"] if words else 0.0
+                lrc_metrics.count("lines_unanchored")
                 lrc.append(f"{_fmt_ts(t, ms_digits)}{clean_lines[i]}")
-    with open(out_path, "w", encoding="utf-8") as f:
-        f.write("\n".join(lrc))
+    with lrc_metrics.stage("write"):
+        with open(out_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lrc))
     return out_path
 
 def _self_test():
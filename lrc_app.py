@@ -2,11 +2,14 @@ import argparse
 import json
 
 import re
-import subprocess
-import imghdr
-from mutagen.id3 import ID3, APIC, TIT2, TPE1, TALB, error
-from mutagen.mp3 import MP3
-from mutagen.mp4 import MP4, MP4Cover
+import shlex
+import sys
+
+import lrc_metrics
+
+# mutagen and subprocess are imported inside the functions that use them so
+# text-only commands (offset, export, set, ...) start without loading them.
+PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
 
 def _parse_ts(s: str) -> int | None:
     """
@@ -74,7 +77,7 @@ def read_lrc(path: str) -> tuple[dict, list]:
     headers = {}
     entries = []
     try:
-        with open(path, "r", encoding="utf-8") as f:
+        with lrc_metrics.stage("read_lrc"), open(path, "r", encoding="utf-8") as f:
             for line in f:
                 line = line.rstrip("\n")
                 if re.match(r"^\[[a-zA-Z]+:.*\]$", line):
@@ -89,6 +92,7 @@ def read_lrc(path: str) -> tuple[dict, list]:
     except FileNotFoundError:
         print(f"Error: File not found at {path}")
         return None, None
+    lrc_metrics.count("lrc_lines_read", len(entries))
     return headers, entries
 
 def write_lrc(path: str, headers: dict, entries: list, digits: int = 2) -> None:
@@ -107,7 +111,8 @@ def write_lrc(path: str, headers: dict, entries: list, digits: int = 2) -> None:
             lines.append(f"[{k}:{headers[k]}]")
     for e in entries:
         lines.append(f"{_fmt_ts(e['t'], digits)}{e['text']}")
-    with open(path, "w", encoding="utf-8") as f:
+    lrc_metrics.count("lrc_lines_written", len(entries))
+    with lrc_metrics.stage("write_lrc"), open(path, "w", encoding="utf-8") as f:
         f.write("\n".join(lines))
 
 def ffprobe_info(audio_path: str) -> dict:
@@ -120,8 +125,10 @@ def ffprobe_info(audio_path: str) -> dict:
     Returns:
         A dict containing audio information like title, artist, album, and duration.
     """
+    import subprocess
     try:
-        p = subprocess.run(["ffprobe","-v","quiet","-print_format","json","-show_format","-show_streams",audio_path], capture_output=True, check=True)
+        with lrc_metrics.stage("ffprobe"):
+            p = subprocess.run(["ffprobe","-v","quiet","-print_format","json","-show_format","-show_streams",audio_path], capture_output=True, check=True)
         data = json.loads(p.stdout.decode())
         fmt = data.get("format",{})
         tags = fmt.get("tags",{})
@@ -183,21 +190,37 @@ def cmd_offset(args: argparse.Namespace) -> None:
     write_lrc(args.lrc, h, e2, digits=2)
     print(args.lrc)
 
-def cmd_sync(args: argparse.Namespace) -> None:
+def sync_headers(lrc_path: str, audio_path: str, digits: int = 2) -> bool:
     """
-    Sync headers of a .lrc file with audio file tags.
+    Copy title, artist and album tags from an audio file into a .lrc file.
+
+    Args:
+        lrc_path: The path to the .lrc file.
+        audio_path: The path to the audio file.
+        digits: The number of digits for the fractional part (2 or 3).
+
+    Returns:
+        True if the .lrc file was rewritten, False if it could not be read.
     """
-    h, e = read_lrc(args.lrc)
+    h, e = read_lrc(lrc_path)
     if h is None:
-        return
-    ai = ffprobe_info(args.audio)
+        return False
+    ai = ffprobe_info(audio_path) or {}
     if ai.get("title"):
         h["ti"] = ai["title"]
     if ai.get("artist"):
         h["ar"] = ai["artist"]
     if ai.get("album"):
         h["al"] = ai["album"]
-    write_lrc(args.lrc, h, e, digits=2)
+    write_lrc(lrc_path, h, e, digits=digits)
+    return True
+
+def cmd_sync(args: argparse.Namespace) -> None:
+    """
+    Sync headers of a .lrc file with audio file tags.
+    """
+    if not sync_headers(args.lrc, args.audio, digits=2):
+        return
     print(args.lrc)
 
 def cmd_export(args: argparse.Namespace) -> None:
@@ -216,11 +239,17 @@ def set_cover(audio_path: str, cover_path: str) -> bool:
     """
     Set the cover image for an audio file.
     """
+    with lrc_metrics.stage("tag_write"):
+        return _set_cover(audio_path, cover_path)
+
+def _set_cover(audio_path: str, cover_path: str) -> bool:
+    from mutagen.id3 import ID3, APIC, error
+    from mutagen.mp3 import MP3
+    from mutagen.mp4 import MP4, MP4Cover
 
     with open(cover_path, "rb") as f:
         data = f.read()
-    kind = imghdr.what(None, data)
-    mime = "image/jpeg" if kind in ("jpeg","jpg") else ("image/png" if kind == "png" else "image/jpeg")
+    mime = "image/png" if data.startswith(PNG_MAGIC) else "image/jpeg"
     if audio_path.lower().endswith(".mp3"):
         audio = MP3(audio_path, ID3=ID3)
         try:
@@ -249,6 +278,14 @@ def set_audio_tags(audio_path: str, ti: str | None = None, ar: str | None = None
     """
     Set audio tags for an audio file.
     """
+    with lrc_metrics.stage("tag_write"):
+        return _set_audio_tags(audio_path, ti, ar, al)
+
+def _set_audio_tags(audio_path: str, ti: str | None, ar: str | None, al: str | None) -> bool:
+    from mutagen.id3 import ID3, TIT2, TPE1, TALB, error
+    from mutagen.mp3 import MP3
+    from mutagen.mp4 import MP4
+
     if audio_path.lower().endswith(".mp3"):
         audio = MP3(audio_path, ID3=ID3)
         try:
@@ -282,9 +319,66 @@ def cmd_atag(args: argparse.Namespace) -> None:
     ok = set_audio_tags(args.audio, args.ti, args.ar, args.al)
     print("OK" if ok else "UNSUPPORTED")
 
-def main() -> None:
+def cmd_batch(args: argparse.Namespace) -> None:
     """
-    Main function to parse command line arguments and execute commands.
+    Run one command per line from a file or stdin in this process.
+
+    Scripts that call lrc_app many times can pipe their commands here to pay
+    interpreter and import start-up once. Lines are split like a shell would;
+    blank lines and lines starting with # are skipped. Every line is attempted;
+    the exit status is 1 if any of them failed.
+    """
+    p = build_parser()
+    failed = 0
+    try:
+        f = open(args.file, "r", encoding="utf-8") if args.file != "-" else sys.stdin
+    except FileNotFoundError:
+        print(f"Error: File not found at {args.file}")
+        sys.exit(1)
+    try:
+        for n, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                sub = p.parse_args(shlex.split(line))
+            except ValueError as e:
+                print(f"Error on line {n}: {line} ({e})", file=sys.stderr)
+                failed += 1
+                continue
+            except SystemExit as e:
+                # argparse has already printed the usage error; -h exits 0.
+                if e.code:
+                    print(f"Error on line {n}: {line}", file=sys.stderr)
+                    failed += 1
+                continue
+            if not getattr(sub, "cmd", None) or sub.cmd == "batch":
+                print(f"Error on line {n}: {line} (expected a command other than batch)", file=sys.stderr)
+                failed += 1
+                continue
+            try:
+                run_command(sub)
+            except Exception as e:
+                print(f"Error on line {n}: {line} ({type(e).__name__}: {e})", file=sys.stderr)
+                failed += 1
+            sys.stdout.flush()
+    finally:
+        if f is not sys.stdin:
+            f.close()
+    if failed:
+        print(f"{failed} command(s) failed", file=sys.stderr)
+        sys.exit(1)
+
+def run_command(args: argparse.Namespace) -> None:
+    """
+    Execute a parsed command, recording metrics when enabled.
+    """
+    with lrc_metrics.run("lrc_app:" + args.cmd):
+        args.func(args)
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the command line parser for all subcommands.
     """
     p = argparse.ArgumentParser()
     sub = p.add_subparsers(dest="cmd")
@@ -321,11 +415,24 @@ def main() -> None:
     sp.add_argument("--ar")
     sp.add_argument("--al")
     sp.set_defaults(func=cmd_atag)
+    sp = sub.add_parser("batch")
+    sp.add_argument("file", nargs="?", default="-")
+    sp.set_defaults(func=cmd_batch)
+    return p
+
+def main() -> None:
+    """
+    Main function to parse command line arguments and execute commands.
+    """
+    p = build_parser()
     args = p.parse_args()
     if not getattr(args, "cmd", None):
         p.print_help()
         return
-    args.func(args)
+    if args.cmd == "batch":
+        args.func(args)
+        return
+    run_command(args)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,272 @@
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+# Instrumentation is off unless one of these is set:
+#   LRC_METRICS=path.jsonl   append one JSON line per run
+#   LRC_METRICS_PROM=dir     write a Prometheus textfile <dir>/lrc_<command>.prom per run
+#   LRC_PROFILE=path.prof    dump cProfile stats of the last run ({command} is substituted)
+ENV_JSON = "LRC_METRICS"
+ENV_PROM = "LRC_METRICS_PROM"
+ENV_PROFILE = "LRC_PROFILE"
+
+_local = threading.local()
+_write_lock = threading.Lock()
+
+def peak_rss_mb() -> float | None:
+    """
+    Return the peak resident set size of this process in megabytes, or None
+    where the POSIX resource module is unavailable (Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux.
+    if sys.platform == "darwin":
+        rss /= 1024
+    return rss / 1024
+
+def enabled() -> bool:
+    """
+    Return True if any metrics or profiling output is configured.
+    """
+    return bool(os.environ.get(ENV_JSON) or os.environ.get(ENV_PROM) or os.environ.get(ENV_PROFILE))
+
+class Run:
+    """
+    Stage timings and counters collected for one command or request.
+    """
+
+    def __init__(self, command: str, profile: bool | None = None):
+        self.command = command
+        self.stages = {}
+        self.counts = {}
+        self.t0 = time.perf_counter()
+        self.started_at = time.time()
+        self.profiler = None
+        if profile is None:
+            profile = bool(os.environ.get(ENV_PROFILE))
+        if profile:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            try:
+                self.profiler.enable()
+            except ValueError:
+                # Another request on a different thread is already profiling.
+                self.profiler = None
+
+    def to_dict(self, error: BaseException | None = None) -> dict:
+        return {
+            "command": self.command,
+            "time": self.started_at,
+            "ok": error is None,
+            "error": f"{type(error).__name__}: {error}" if error is not None else None,
+            "wall_s": time.perf_counter() - self.t0,
+            "stages": self.stages,
+            "counts": self.counts,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+def current() -> Run | None:
+    """
+    Return the run active on this thread, if any.
+    """
+    return getattr(_local, "run", None)
+
+def start(command: str) -> Run | None:
+    """
+    Start recording a run on this thread.
+
+    Args:
+        command: The command or route name, e.g. "lrc_app:sync".
+
+    Returns:
+        The new run, or None if metrics are disabled or a run is already active
+        (nested callers such as generate_lrc inside watch_lrc then add their
+        stages to the outer run).
+    """
+    if current() is not None or not enabled():
+        return None
+    _local.run = Run(command)
+    return _local.run
+
+def finish(run: Run | None, error: BaseException | None = None) -> dict | None:
+    """
+    Stop a run started with start() and write its configured outputs.
+
+    Args:
+        run: The run returned by start(); None is ignored.
+        error: The exception that ended the run, if any.
+
+    Returns:
+        The recorded run as a dict, or None.
+    """
+    if run is None:
+        return None
+    _local.run = None
+    if run.profiler is not None:
+        run.profiler.disable()
+    rec = run.to_dict(error)
+    # Instrumentation must never fail the command it observes, so a broken
+    # sink only produces a warning.
+    with _write_lock:
+        path = os.environ.get(ENV_JSON)
+        if path:
+            try:
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            except Exception as e:
+                _warn(ENV_JSON, e)
+        prom_dir = os.environ.get(ENV_PROM)
+        if prom_dir:
+            try:
+                _write_prom(prom_dir, rec)
+            except Exception as e:
+                _warn(ENV_PROM, e)
+        prof = os.environ.get(ENV_PROFILE)
+        if prof and run.profiler is not None:
+            try:
+                run.profiler.dump_stats(prof.replace("{command}", _safe_name(run.command)))
+            except Exception as e:
+                _warn(ENV_PROFILE, e)
+    return rec
+
+def _warn(env: str, e: Exception) -> None:
+    print(f"Warning: could not write {env} output: {e}", file=sys.stderr)
+
+@contextlib.contextmanager
+def run(command: str):
+    """
+    Record a run for the duration of a with block.
+
+    Args:
+        command: The command or route name.
+    """
+    r = start(command)
+    try:
+        yield r
+    except BaseException as e:
+        finish(r, e)
+        raise
+    finish(r)
+
+@contextlib.contextmanager
+def collect(command: str):
+    """
+    Record a run for a with block whether or not metrics are enabled, without
+    writing any output; for callers that read the stages and counters
+    themselves (eval_lrc).
+
+    Args:
+        command: The command name.
+    """
+    prev = current()
+    r = Run(command, profile=False)
+    _local.run = r
+    try:
+        yield r
+    finally:
+        _local.run = prev
+
+@contextlib.contextmanager
+def stage(name: str):
+    """
+    Add the time spent in a with block to the named stage of the current run.
+
+    Args:
+        name: The stage name, e.g. "transcribe".
+    """
+    r = current()
+    if r is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        r.stages[name] = r.stages.get(name, 0.0) + time.perf_counter() - t0
+
+@contextlib.contextmanager
+def failed_stage(name: str):
+    """
+    Charge a with block to the named stage if it raises.
+
+    Stages recorded inside a block that fails (model load, transcribe, ...)
+    are rolled back and its whole duration goes to `name` instead, so a failed
+    attempt followed by a retry is not mixed into the retry's stages.
+
+    Args:
+        name: The stage name, e.g. "whisperx_failed".
+    """
+    r = current()
+    if r is None:
+        yield
+        return
+    before = dict(r.stages)
+    t0 = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        r.stages.clear()
+        r.stages.update(before)
+        r.stages[name] = r.stages.get(name, 0.0) + time.perf_counter() - t0
+        raise
+
+def count(name: str, n: int = 1) -> None:
+    """
+    Add n to the named counter of the current run.
+
+    Args:
+        name: The counter name, e.g. "ratio_calls".
+        n: The amount to add.
+    """
+    r = current()
+    if r is not None:
+        r.counts[name] = r.counts.get(name, 0) + n
+
+def _safe_name(s: str) -> str:
+    return "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in s)
+
+def _label(s: str) -> str:
+    return s.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _write_prom(prom_dir: str, rec: dict) -> None:
+    import tempfile
+    cmd = _label(rec["command"])
+    lines = [
+        "# TYPE lrc_run_seconds gauge",
+        f'lrc_run_seconds{{command="{cmd}"}} {rec["wall_s"]:.6f}',
+        "# TYPE lrc_run_ok gauge",
+        f'lrc_run_ok{{command="{cmd}"}} {1 if rec["ok"] else 0}',
+        "# TYPE lrc_run_timestamp_seconds gauge",
+        f'lrc_run_timestamp_seconds{{command="{cmd}"}} {rec["time"]:.3f}',
+    ]
+    if rec["peak_rss_mb"] is not None:
+        lines.append("# TYPE lrc_peak_rss_bytes gauge")
+        lines.append(f'lrc_peak_rss_bytes{{command="{cmd}"}} {int(rec["peak_rss_mb"] * 1024 * 1024)}')
+    lines.append("# TYPE lrc_stage_seconds gauge")
+    for k, v in rec["stages"].items():
+        lines.append(f'lrc_stage_seconds{{command="{cmd}",stage="{_label(k)}"}} {v:.6f}')
+    lines.append("# TYPE lrc_count gauge")
+    for k, v in rec["counts"].items():
+        lines.append(f'lrc_count{{command="{cmd}",name="{_label(k)}"}} {v}')
+    path = os.path.join(prom_dir, f"lrc_{_safe_name(rec['command'])}.prom")
+    # Write then rename so the textfile collector never reads a partial file;
+    # the temp name is unique so concurrent runs do not clobber each other.
+    fd, tmp = tempfile.mkstemp(prefix=".lrc_", suffix=".prom.tmp", dir=prom_dir)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
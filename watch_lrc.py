@@ -0,0 +1,335 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+
+import lrc_metrics
+from gen_lrc import generate_lrc
+from lrc_app import sync_headers
+
+AUDIO_EXTS = (".mp3", ".m4a", ".mp4", ".wav", ".flac")
+STATE_NAME = ".watch_lrc_state.json"
+
+def _stat_key(path: str) -> list | None:
+    """
+    Return the (size, mtime_ns) pair used to detect changes to a file.
+
+    Args:
+        path: The path to the file.
+
+    Returns:
+        A two-element list, or None if the file does not exist.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+def find_pairs(folder: str) -> list:
+    """
+    Pair audio files with lyrics of the same name (song.mp3 + song.txt).
+
+    Args:
+        folder: The folder to scan.
+
+    Returns:
+        A list of (audio_path, lyrics_path) tuples, sorted by audio path.
+    """
+    names = {}
+    with os.scandir(folder) as it:
+        for de in it:
+            if de.is_file() and not de.name.startswith("."):
+                stem, ext = os.path.splitext(de.name)
+                names.setdefault(stem, {})[ext.lower()] = de.path
+    pairs = []
+    for stem, exts in names.items():
+        if ".txt" not in exts:
+            continue
+        for ext in AUDIO_EXTS:
+            if ext in exts:
+                pairs.append((exts[ext], exts[".txt"]))
+                break
+    pairs.sort()
+    return pairs
+
+def _state_key(audio_path: str) -> str:
+    # Keyed by file name rather than path so restarting with "./drop",
+    # "/abs/drop/" or from another working directory finds the same entries.
+    return os.path.basename(audio_path)
+
+def load_state(path: str) -> dict:
+    """
+    Load the processed-file state written by a previous run.
+
+    Args:
+        path: The path to the state file.
+
+    Returns:
+        A dict mapping audio file names to their recorded file signatures.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_state(path: str, state: dict) -> None:
+    """
+    Atomically write the processed-file state.
+
+    Args:
+        path: The path to the state file.
+        state: The state dict.
+    """
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+class _Waiter:
+    """
+    Block until the watched folder changes, using inotify when available and
+    falling back to sleeping for the poll interval.
+    """
+
+    def __init__(self, folder: str, interval: float, poll: bool = False):
+        self.interval = interval
+        self.inotify = None
+        if poll:
+            return
+        try:
+            from inotify_simple import INotify, flags
+            ino = INotify()
+            ino.add_watch(folder, flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE | flags.DELETE)
+            self.inotify = ino
+        except Exception:
+            self.inotify = None
+
+    def wait(self, timeout: float | None) -> None:
+        """
+        Wait for a change in the folder or until timeout seconds pass.
+
+        Args:
+            timeout: Maximum seconds to wait, or None to wait for the next event.
+        """
+        if self.inotify is None:
+            time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+            return
+        self.inotify.read(timeout=None if timeout is None else int(timeout * 1000))
+
+class Watcher:
+    """
+    Watch a folder for audio + lyrics pairs and generate a synced .lrc for each.
+
+    Files must keep the same size and mtime for `settle` seconds before they are
+    picked up, so uploads still being written are not processed half-way. Jobs
+    run on one worker thread so ASR models loaded by gen_lrc stay warm between
+    songs, and the queue is bounded so a large drop does not pile up in memory.
+    """
+
+    def __init__(self, folder: str, ms_digits: int = 3, settle: float = 5.0, interval: float = 2.0,
+                 max_queue: int = 8, state_path: str | None = None, poll: bool = False):
+        self.folder = folder
+        self.ms_digits = ms_digits
+        self.settle = settle
+        self.state_path = state_path or os.path.join(folder, STATE_NAME)
+        self.state = load_state(self.state_path)
+        self.lock = threading.Lock()
+        self.jobs = queue.Queue(maxsize=max_queue)
+        self.queued = set()
+        self.pending = {}
+        self.waiter = _Waiter(folder, interval, poll)
+
+    def _signature(self, audio_path: str, lyrics_path: str) -> dict | None:
+        a = _stat_key(audio_path)
+        t = _stat_key(lyrics_path)
+        if a is None or t is None:
+            return None
+        return {"audio": a, "lyrics": t}
+
+    def scan(self, now: float | None = None) -> int:
+        """
+        Queue every settled pair that has not been processed in its current form.
+
+        Args:
+            now: The current monotonic time, for tests.
+
+        Returns:
+            The number of pairs still waiting to settle.
+        """
+        now = time.monotonic() if now is None else now
+        seen = set()
+        for audio_path, lyrics_path in find_pairs(self.folder):
+            seen.add(audio_path)
+            sig = self._signature(audio_path, lyrics_path)
+            if sig is None:
+                continue
+            with self.lock:
+                done = self.state.get(_state_key(audio_path), {}).get("sig") == sig
+                busy = audio_path in self.queued
+            if done or busy:
+                self.pending.pop(audio_path, None)
+                continue
+            last = self.pending.get(audio_path)
+            if last is None or last[0] != sig:
+                self.pending[audio_path] = (sig, now)
+                continue
+            if now - last[1] < self.settle:
+                continue
+            try:
+                self.jobs.put_nowait((audio_path, lyrics_path, sig))
+            except queue.Full:
+                continue
+            with self.lock:
+                self.queued.add(audio_path)
+            del self.pending[audio_path]
+        for p in list(self.pending):
+            if p not in seen:
+                del self.pending[p]
+        return len(self.pending)
+
+    def process(self, audio_path: str, lyrics_path: str, sig: dict) -> str | None:
+        """
+        Generate the .lrc for one pair and sync its headers from the audio tags.
+
+        Args:
+            audio_path: The path to the audio file.
+            lyrics_path: The path to the lyrics .txt file.
+            sig: The file signature recorded when the pair was queued.
+
+        Returns:
+            The path of the written .lrc file, or None if generation failed.
+        """
+        out_path = os.path.splitext(audio_path)[0] + ".lrc"
+        try:
+            with lrc_metrics.run("watch_lrc"):
+                generate_lrc(audio_path, lyrics_path, out_path, self.ms_digits)
+                sync_headers(out_path, audio_path, digits=self.ms_digits)
+        except Exception as e:
+            print(f"Error processing {audio_path}: {e}")
+            out_path = None
+        with self.lock:
+            # Failed pairs are recorded too so a bad file is not retried in a
+            # loop; touching either file changes the signature and retries it.
+            self.state[_state_key(audio_path)] = {"sig": sig, "lrc": out_path and os.path.basename(out_path), "at": time.time()}
+            save_state(self.state_path, self.state)
+            self.queued.discard(audio_path)
+        if out_path:
+            print(out_path)
+        return out_path
+
+    def _drain(self) -> None:
+        # Drop songs that have not started yet so shutdown only waits for the
+        # one in progress; they are not in the state file and are picked up
+        # again on the next start.
+        while True:
+            try:
+                job = self.jobs.get_nowait()
+            except queue.Empty:
+                return
+            with self.lock:
+                self.queued.discard(job[0])
+            self.jobs.task_done()
+
+    def _worker(self) -> None:
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                self.jobs.task_done()
+                return
+            try:
+                self.process(*job)
+            finally:
+                self.jobs.task_done()
+
+    def run(self, once: bool = False) -> None:
+        """
+        Watch the folder until interrupted.
+
+        Args:
+            once: Process what is currently in the folder, then return.
+        """
+        worker = threading.Thread(target=self._worker, daemon=True)
+        worker.start()
+        try:
+            while True:
+                waiting = self.scan()
+                if once and not waiting and self.jobs.empty():
+                    self.jobs.join()
+                    if not self.scan():
+                        break
+                    continue
+                self.waiter.wait(self.settle if waiting or once else None)
+        except KeyboardInterrupt:
+            self._drain()
+        self.jobs.put(None)
+        worker.join()
+
+def _self_test():
+    global generate_lrc, sync_headers
+    calls = []
+
+    def fake_generate(audio_path, lyrics_path, out_path, ms_digits=3):
+        calls.append(os.path.basename(audio_path))
+        with open(out_path, "w", encoding="utf-8") as f:
+            f.write("[00:01.000]x")
+        return out_path
+
+    orig = generate_lrc, sync_headers
+    generate_lrc = fake_generate
+    sync_headers = lambda *args, **kwargs: True
+    checks = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+            for name, data in (("a.mp3", "x"), ("a.txt", "la"), ("b.m4a", "x"), ("b.txt", "la"), ("c.txt", "la")):
+                with open(os.path.join(tmp, name), "w", encoding="utf-8") as f:
+                    f.write(data)
+            # Pairs wait for the settle time, and a full queue holds the rest back.
+            w = Watcher(tmp, settle=10, poll=True, max_queue=1)
+            checks.append(w.scan(now=0) == 2 and w.jobs.empty())
+            checks.append(w.scan(now=5) == 2 and w.jobs.empty())
+            checks.append(w.scan(now=11) == 1 and w.jobs.qsize() == 1)
+            Watcher(tmp, settle=0, poll=True, interval=0.01).run(once=True)
+            checks.append(sorted(calls) == ["a.mp3", "b.m4a"])
+            # A restart through a differently spelled path finds nothing to do.
+            Watcher(os.path.join(tmp, "."), settle=0, poll=True, interval=0.01).run(once=True)
+            checks.append(len(calls) == 2)
+            # Changing the lyrics reprocesses only that song.
+            with open(os.path.join(tmp, "a.txt"), "w", encoding="utf-8") as f:
+                f.write("la la")
+            Watcher(tmp, settle=0, poll=True, interval=0.01).run(once=True)
+            checks.append(calls[2:] == ["a.mp3"])
+    finally:
+        generate_lrc, sync_headers = orig
+    print("SELF_TEST_OK" if all(checks) else "SELF_TEST_FAIL")
+    return all(checks)
+
+def main() -> None:
+    """
+    Main function to parse command line arguments and start the watcher.
+    """
+    if len(sys.argv) >= 2 and sys.argv[1] == "--self-test":
+        sys.exit(0 if _self_test() else 1)
+    p = argparse.ArgumentParser()
+    p.add_argument("folder")
+    p.add_argument("--digits", type=int, default=3)
+    p.add_argument("--settle", type=float, default=5.0, help="seconds a file must stay unchanged before processing")
+    p.add_argument("--interval", type=float, default=2.0, help="poll interval when inotify is unavailable")
+    p.add_argument("--queue", type=int, default=8, help="maximum number of queued songs")
+    p.add_argument("--state", help="state file (default: <folder>/" + STATE_NAME + ")")
+    p.add_argument("--poll", action="store_true", help="always poll instead of using inotify")
+    p.add_argument("--once", action="store_true", help="process the current folder contents and exit")
+    args = p.parse_args()
+    w = Watcher(args.folder, ms_digits=args.digits, settle=args.settle, interval=args.interval,
+                max_queue=args.queue, state_path=args.state, poll=args.poll)
+    w.run(once=args.once)
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,20 @@
-from flask import Flask, request, redirect, send_file
+from flask import Flask, g, request, redirect, send_file
 import os
+import lrc_metrics
 from lrc_app import read_lrc, write_lrc, ffprobe_info, set_cover, _fmt_ts
 from werkzeug.utils import secure_filename
 import urllib.parse
 
 app = Flask(__name__)
 
+@app.before_request
+def _metrics_start():
+    g.metrics_run = lrc_metrics.start("web_app:" + (request.endpoint or "unknown"))
+
+@app.teardown_request
+def _metrics_finish(exc):
+    lrc_metrics.finish(g.pop("metrics_run", None), exc)
+
 def default_paths():
     base = "/Users/goudan/MyProject/Music2"
     return os.path.join(base, "m.lrc"), os.path.join(base, "m.mp3")